@@ -1,20 +1,8 @@
+import asyncio
 import socket
 import struct
 import traceback # stanard library used to pack and unpack binary data for network transmission
-from protocol import (MAGIC_COOKIE, REQUEST_SIZE, SERVER_PAYLOAD_SIZE, CLIENT_PAYLOAD_SIZE, GAME_RESULT_NOTOVER, GAME_RESULT_LOSS, GAME_RESULT_TIE, GAME_RESULT_WIN, pack_request, pack_client_payload, unpack_server_payload, unpack_offer)
-
-def recv_exact(sock, n):
-    """
-    Receives exactly n bytes from a TCP socket.
-    Keeps reading until the buffer is full.
-    """
-    data = b""
-    while len(data) < n:
-        chunk = sock.recv(n - len(data))
-        if chunk == b"":
-            raise ConnectionError("socket closed while receiving")
-        data += chunk
-    return data
+from protocol import (MAGIC_COOKIE, REQUEST_SIZE, SERVER_PAYLOAD_SIZE, CLIENT_PAYLOAD_SIZE, GAME_RESULT_NOTOVER, GAME_RESULT_LOSS, GAME_RESULT_TIE, GAME_RESULT_WIN, pack_request, pack_client_payload, unpack_server_payload, unpack_offer, unpack_cookie)
 
 def result_to_str(r):
     """
@@ -26,6 +14,9 @@ def result_to_str(r):
     if r == GAME_RESULT_TIE: return "TIE"
     return f"UNKNOWN({r})"
 
+# point value per rank, indexed by rank (1-13), index 0 unused
+_RANK_VALUE = (0, 11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10)
+
 def rank_value(rank):
     """
     Returns the Blackjack point value of a card rank
@@ -41,49 +32,55 @@ def rank_value(rank):
     Returns:
     Integer value representing the card's contribution to the hand
     """
-    if rank >= 11:
-        return 10
-    if rank == 1:
-        return 11
-    return rank
-
-def hand_total(ranks): # need to change documentation
-    """
-    Calculates the total score of a hand.
+    return _RANK_VALUE[rank] if rank < 14 else 10 # out-of-range ranks score like a face card, as before
 
-    Each card in the hand is a tuple: (rank, suit).
-    The score of each card is determined by rank_value(rank).
+_RANKS = {1: "A", 11: "J", 12: "Q", 13: "K"}
+_SUITS = {0: "♣", 1: "♦", 2: "♥", 3: "♠"}
 
-    Note:
-    - Ace (rank 1) is always worth 11 points.
-    - No dynamic Ace adjustment is performed.
+# string of every valid card, built once
+_CARD_STR = {(r, s): f"{_RANKS.get(r, str(r))} {_SUITS[s]}" for r in range(1, 14) for s in range(4)}
 
-    Parameters:
-    hand -- list of (rank, suit) tuples
-
-    Returns:
-    Integer representing the total score of the hand.
+def card_to_str(rank, suit):
     """
-    # total = 0
-
-    # for rank in ranks:
-    #     total += rank_value(rank)
+    convert cards to string
+    """
+    card = _CARD_STR.get((rank, suit))
+    if card is None: # not a valid card, format it the slow way
+        card = f"{_RANKS.get(rank, str(rank))} {_SUITS.get(suit, '?')}"
+    return card
 
-    # return total
-    return sum(ranks)
+def add_card_str(hand_str, rank, suit):
+    """
+    Returns the hand display string with one more card appended
+    ("A ♠" -> "A ♠, 10 ♣"), so a hand is never re-joined from scratch
+    """
+    card = card_to_str(rank, suit)
+    if not hand_str:
+        return card
+    return f"{hand_str}, {card}"
 
-def card_to_str(rank, suit):
+class OfferProtocol(asyncio.DatagramProtocol):
     """
-    convert cards to string
+    Receives UDP broadcast offers and resolves the given future
+    with the first valid one: (server_ip, server_port, server_name)
     """
-    ranks = {1: "A", 11: "J", 12: "Q", 13: "K"}
-    suits = {0: "♣", 1: "♦", 2: "♥", 3: "♠"}
 
-    r = ranks.get(rank, str(rank))
-    s = suits.get(suit, "?")
-    return f"{r} {s}"
+    def __init__(self, offer):
+        self.offer = offer
+
+    def datagram_received(self, data, addr):
+        try:
+            # validate the cookie first, then unpack the rest
+            if unpack_cookie(data) != MAGIC_COOKIE:
+                return
+            cookie, msg_type, server_port, server_name = unpack_offer(data)
+        except Exception:
+            return # ignore a packet and keep listening if a packet is not valid
+
+        if msg_type == 0x2 and not self.offer.done(): # 0x2 is OFFER
+            self.offer.set_result((addr[0], server_port, server_name))
 
-def listen_to_offer():
+async def listen_to_offer():
     """
     Listens for UDP broadcast offers from the server.
     Returns the server's IP and TCP port.
@@ -99,34 +96,30 @@ def listen_to_offer():
 
     udp_sock.bind(("", UDP_PORT))
 
+    loop = asyncio.get_running_loop()
+    offer = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(lambda: OfferProtocol(offer), sock=udp_sock)
+
     print("client started, listening for offer requests...") # "player looking for dealer to play with..."
 
-    while True:
-        try:
-            # receive UDP packet (buffer size 1024 is enough for offer)
-            data, addr = udp_sock.recvfrom(1024)
+    try:
+        server_ip, server_port, server_name = await offer
+    finally:
+        transport.close() # also closes udp_sock
 
-            # unpack and validate
-            cookie, msg_type, server_port, server_name = unpack_offer(data)
+    # clean up the server name string
+    server_name_clean = server_name.strip('\x00')
+    print(f"Received offer from server '{server_name_clean}'")
 
-            if cookie == MAGIC_COOKIE and msg_type == 0x2: # 0x2 is OFFER
-                # clean up the server name string
-                server_name_clean = server_name.strip('\x00')
-                print(f"Received offer from server '{server_name_clean}'")
-                
-                return addr[0], server_port
+    return server_ip, server_port
 
-        except Exception as e:
-            # ignore a packet and keep listening if a packet is valid
-            continue
-
-def main():
+async def main():
     """
     Main client execution flow
 
     Steps:
     1. Find server by UDP offers
-    2. Connect via TCP
+    2. Connect via TCP (asyncio streams)
     3. Send REQUEST (rounds + client name)
     4. For each round:
        - Receive initial deal (2 player cards + 1 dealer upcard)
@@ -136,57 +129,58 @@ def main():
     """
     while True:
         # === find a server - UDP ===
-        server_ip, server_tcp_port = listen_to_offer()
+        server_ip, server_tcp_port = await listen_to_offer()
 
         # === connect - TCP ===
-        sock = None
+        writer = None
         wins = losses = ties = 0  # define here so it's available in finally too
 
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.connect((server_ip, server_tcp_port))
+            # asyncio turns on TCP_NODELAY for TCP streams, so a Hit is not delayed by Nagle
+            reader, writer = await asyncio.open_connection(server_ip, server_tcp_port)
 
             # === game setup ===
             client_name = "OFRIELOV"
             try:
-                rounds = int(input("How many rounds would you like to play? "))
+                rounds = int(await asyncio.to_thread(input, "How many rounds would you like to play? "))
             except ValueError:
                 rounds = 3
 
             # send the request packet
-            sock.sendall(pack_request(rounds, client_name))
+            writer.write(pack_request(rounds, client_name))
+            await writer.drain()
 
             # === game loop (exactly 'rounds' rounds) ===
             for round_idx in range(rounds):
                 # --- 1) initial deal: read 3 payloads (2 player + 1 dealer upcard) ---
-                player_cards = []
-                dealer_cards = []
-                player_ranks = []
+                player_hand_str = ""
+                dealer_hand_str = ""
+                player_score = 0 # updated on every new player card
 
                 for i in range(3):
-                    data = recv_exact(sock, SERVER_PAYLOAD_SIZE)
-                    cookie, msg_type, game_result, card_rank, card_suit = unpack_server_payload(data)
-
-                    if cookie != MAGIC_COOKIE:
+                    data = await reader.readexactly(SERVER_PAYLOAD_SIZE)
+                    if unpack_cookie(data) != MAGIC_COOKIE:
                         raise ValueError("Invalid cookie from server during initial deal")
 
+                    cookie, msg_type, game_result, card_rank, card_suit = unpack_server_payload(data)
+
                     if i < 2: # first and second cards (the player's)
-                        player_cards.append(card_to_str(card_rank, card_suit))
+                        player_hand_str = add_card_str(player_hand_str, card_rank, card_suit)
 
-                        player_ranks.append(rank_value(card_rank))
+                        player_score += rank_value(card_rank)
                     else: # the dealer known card
-                        dealer_cards.append(card_to_str(card_rank, card_suit))
+                        dealer_hand_str = add_card_str(dealer_hand_str, card_rank, card_suit)
 
-                print(f"{client_name} hand: {', '.join(player_cards)} || dealer hand: {', '.join(dealer_cards)}")
+                print(f"{client_name} hand: {player_hand_str} || dealer hand: {dealer_hand_str}")
 
 
                 # --- 2) player turn ---
                 while True:
                     # check if player already busted
-                    if hand_total(player_ranks) > 21:
-                        print(f"{client_name} busted! with {hand_total(player_ranks)} points")
+                    if player_score > 21:
+                        print(f"{client_name} busted! with {player_score} points")
                         break
-                    choice = input("Hit or Stand? (H/S): ").strip().upper()
+                    choice = (await asyncio.to_thread(input, "Hit or Stand? (H/S): ")).strip().upper()
                     if choice == "H":
                         decision = "Hittt"
                     elif choice == "S":
@@ -195,23 +189,23 @@ def main():
                         print("Please type 'H' for Hit or 'S' for Stand.")
                         continue
 
-                    sock.sendall(pack_client_payload(decision))
+                    writer.write(pack_client_payload(decision))
+                    await writer.drain()
 
                     if decision == "Stand":
                         break
 
-                    data = recv_exact(sock, SERVER_PAYLOAD_SIZE)
-                    cookie, msg_type, game_result, card_rank, card_suit = unpack_server_payload(data)
-
-                    if cookie != MAGIC_COOKIE:
+                    data = await reader.readexactly(SERVER_PAYLOAD_SIZE)
+                    if unpack_cookie(data) != MAGIC_COOKIE:
                         raise ValueError("Invalid cookie after hit")
 
-                    player_cards.append(card_to_str(card_rank, card_suit))
-                    player_ranks.append(rank_value(card_rank))
+                    cookie, msg_type, game_result, card_rank, card_suit = unpack_server_payload(data)
+
+                    player_hand_str = add_card_str(player_hand_str, card_rank, card_suit)
+                    player_score += rank_value(card_rank)
 
-                    print(f"{client_name} hand: {', '.join(player_cards)} || dealer hand: {', '.join(dealer_cards)}")
+                    print(f"{client_name} hand: {player_hand_str} || dealer hand: {dealer_hand_str}")
 
-                    player_score = hand_total(player_ranks)
                     if player_score > 21:
                         print(f"{client_name} busted! with {player_score} points")
                         break
@@ -220,15 +214,15 @@ def main():
 
                 # dealer + result
                 while True:
-                    data = recv_exact(sock, SERVER_PAYLOAD_SIZE)
-                    cookie, msg_type, game_result, card_rank, card_suit = unpack_server_payload(data)
-
-                    if cookie != MAGIC_COOKIE:
+                    data = await reader.readexactly(SERVER_PAYLOAD_SIZE)
+                    if unpack_cookie(data) != MAGIC_COOKIE:
                         raise ValueError("Invalid cookie during dealer turn")
 
+                    cookie, msg_type, game_result, card_rank, card_suit = unpack_server_payload(data)
+
                     if game_result == GAME_RESULT_NOTOVER:
-                        dealer_cards.append(card_to_str(card_rank, card_suit))
-                        print(f"{client_name} hand: {', '.join(player_cards)} || dealer hand: {', '.join(dealer_cards)}")
+                        dealer_hand_str = add_card_str(dealer_hand_str, card_rank, card_suit)
+                        print(f"{client_name} hand: {player_hand_str} || dealer hand: {dealer_hand_str}")
                         continue
 
                     if game_result == GAME_RESULT_WIN:
@@ -248,13 +242,13 @@ def main():
             print(f"Error: {e}")
 
         finally:
-            if sock:
-                sock.close()
+            if writer:
+                writer.close()
             print(f"Game summary: wins={wins}, losses={losses}, ties={ties}")
             win_rate = wins / rounds
             print(f"finished playing {rounds} rounds, win rate {win_rate}")
             print("!!! Looking for a new server !!!\n")
             
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
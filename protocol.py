@@ -27,6 +27,26 @@ REQUEST_SIZE = struct.calcsize(REQUEST_FMT)
 CLIENT_PAYLOAD_SIZE = struct.calcsize(CLIENT_PAYLOAD_FMT)
 SERVER_PAYLOAD_SIZE = struct.calcsize(SERVER_PAYLOAD_FMT)
 
+# === Precompiled Structs === parsed once, reused for every message
+_OFFER_S = struct.Struct(OFFER_FMT)
+_REQUEST_S = struct.Struct(REQUEST_FMT)
+_CLIENT_S = struct.Struct(CLIENT_PAYLOAD_FMT)
+_SERVER_S = struct.Struct(SERVER_PAYLOAD_FMT)
+_COOKIE_S = struct.Struct("!I") # the magic cookie every message starts with
+
+# cookie + type + result of every in-game card payload, only rank and suit change
+_NOTOVER_PREFIX = struct.pack("!I B B", MAGIC_COOKIE, MTYPE_PAYLOAD, GAME_RESULT_NOTOVER)
+_CARD_S = struct.Struct("!H B") # rank(2) + suit(1)
+
+def unpack_cookie(data):
+    """
+    Reads only the magic cookie (first 4 bytes) of any message
+
+    Lets the receiver reject a bad message before unpacking (and decoding)
+    the whole thing
+    """
+    return _COOKIE_S.unpack_from(data)[0]
+
 # === Fixed-Length Name Helper ===
 def pack_name(name):
     """
@@ -39,10 +59,8 @@ def pack_name(name):
     This is used when sending names over the network,
     because the protocol requires a fixed length field
     """
-    bytes_name = name.encode("utf-8") # name as bytes
-    bytes_name = bytes_name[:NAME_LEN] # max of 32 bytes
-    bytes_name += b"\x00" * (NAME_LEN - len(bytes_name)) # pad with zeros
-    return bytes_name
+    # name as bytes, max of 32 bytes, padded with zeros
+    return name.encode("utf-8")[:NAME_LEN].ljust(NAME_LEN, b"\x00")
 
 def unpack_name(bytes_name):
     """
@@ -53,7 +71,9 @@ def unpack_name(bytes_name):
     
     This is used when receiving names from the network
     """
-    bytes_name = bytes_name.split(b"\x00")[0] # remove padding
+    end = bytes_name.find(b"\x00") # remove padding (first null byte)
+    if end >= 0:
+        bytes_name = bytes_name[:end]
     return bytes_name.decode("utf-8") # bytes to string
 
 def pack_offer(tcp_port, server_name):
@@ -74,7 +94,7 @@ def pack_offer(tcp_port, server_name):
     Returns:
     A bytes object of length 39, ready to be sent over UDP
     """
-    return struct.pack(OFFER_FMT, MAGIC_COOKIE, MTYPE_OFFER, tcp_port, pack_name(server_name))
+    return _OFFER_S.pack(MAGIC_COOKIE, MTYPE_OFFER, tcp_port, pack_name(server_name))
 
 def unpack_offer(data):
     """
@@ -95,7 +115,7 @@ def unpack_offer(data):
 
     server_name_str is returned as a regular string
     """
-    cookie, message_type, tcp_port, server_name_str = struct.unpack(OFFER_FMT, data)
+    cookie, message_type, tcp_port, server_name_str = _OFFER_S.unpack_from(data)
     return cookie, message_type, tcp_port, unpack_name(server_name_str)
 
 def pack_request(rounds, client_name): 
@@ -118,7 +138,7 @@ def pack_request(rounds, client_name):
     """
     if not (0 <= rounds <= 255):
         raise ValueError('rounds must fit in 1 byte (0-255)')
-    return struct.pack(REQUEST_FMT, MAGIC_COOKIE, MTYPE_REQUEST, rounds, pack_name(client_name))
+    return _REQUEST_S.pack(MAGIC_COOKIE, MTYPE_REQUEST, rounds, pack_name(client_name))
 
 def unpack_request(data):
     """
@@ -139,7 +159,7 @@ def unpack_request(data):
 
     client_name_str is returned as a regular string
     """
-    cookie, message_type, rounds, client_name_str = struct.unpack(REQUEST_FMT, data)
+    cookie, message_type, rounds, client_name_str = _REQUEST_S.unpack_from(data)
     return cookie, message_type, rounds, unpack_name(client_name_str)
 
 def pack_client_payload(decision):
@@ -159,7 +179,7 @@ def pack_client_payload(decision):
     """
     if decision not in ("Hittt", "Stand"):
         raise ValueError('decision must be "Hittt" or "Stand"')
-    return struct.pack(CLIENT_PAYLOAD_FMT, MAGIC_COOKIE, MTYPE_PAYLOAD, decision.encode("ascii"))
+    return _CLIENT_S.pack(MAGIC_COOKIE, MTYPE_PAYLOAD, decision.encode("ascii"))
 
 def unpack_client_payload(data):
     """
@@ -168,7 +188,7 @@ def unpack_client_payload(data):
     Returns:
     (cookie, message_type, decision)
     """
-    cookie, message_type, decision_str = struct.unpack(CLIENT_PAYLOAD_FMT, data)
+    cookie, message_type, decision_str = _CLIENT_S.unpack_from(data)
     return cookie, message_type, decision_str.decode("ascii")
 
 def pack_server_payload(game_result, card_rank, card_suit):
@@ -190,7 +210,25 @@ def pack_server_payload(game_result, card_rank, card_suit):
     Returns:
     A bytes object - length 9
     """
-    return struct.pack(SERVER_PAYLOAD_FMT, MAGIC_COOKIE, MTYPE_PAYLOAD, game_result, card_rank, card_suit)
+    return _SERVER_S.pack(MAGIC_COOKIE, MTYPE_PAYLOAD, game_result, card_rank, card_suit)
+
+def pack_notover_payload(card_rank, card_suit):
+    """
+    Same as pack_server_payload(GAME_RESULT_NOTOVER, card_rank, card_suit)
+
+    Used for every dealt card: the first 6 bytes are always the same,
+    so only rank and suit are packed
+    """
+    return _NOTOVER_PREFIX + _CARD_S.pack(card_rank, card_suit)
+
+def pack_server_payload_into(buf, offset, game_result, card_rank, card_suit):
+    """
+    Same as pack_server_payload, but writes the 9 bytes into buf at offset
+
+    Used to build several payloads in one buffer and send them with a
+    single sendall (the receiver frames them by SERVER_PAYLOAD_SIZE)
+    """
+    _SERVER_S.pack_into(buf, offset, MAGIC_COOKIE, MTYPE_PAYLOAD, game_result, card_rank, card_suit)
 
 def unpack_server_payload(data):
     """
@@ -199,5 +237,5 @@ def unpack_server_payload(data):
     Returns:
     (cookie, message_type, game_result, card_rank, card_suit)
     """
-    cookie, message_type, game_result, card_rank, card_suit = struct.unpack(SERVER_PAYLOAD_FMT, data)
-    return cookie, message_type, game_result, card_rank, card_suit
\ No newline at end of file
+    return _SERVER_S.unpack_from(data)
+
@@ -0,0 +1,137 @@
+"""
+Compiled version of the server's scoring rules, for simulating many rounds
+
+Same rules as server.py (Ace is always 11, J/Q/K are 10, dealer draws to 17),
+but hands are numpy int8 arrays of ranks instead of (rank, suit) tuples so the
+functions can be compiled with Numba. Used by simulate.py, the live server
+does not depend on it.
+
+Requires numpy. Numba is optional: without it the functions run as plain
+Python (slow, but the results are the same).
+    pip install numpy numba
+"""
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("the simulator needs numpy (pip install numpy, optionally numba for speed)") from None
+
+from protocol import GAME_RESULT_LOSS, GAME_RESULT_TIE, GAME_RESULT_WIN
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """
+        Stand-in for numba.njit when Numba is not installed: returns the function as is
+        """
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+def create_deck_arrays():
+    """
+    Creates a standard 52-card deck as two arrays (same order as server.create_deck)
+
+    Returns:
+    A tuple (ranks, suits) of np.int8 arrays of length 52
+    """
+    cards = np.arange(52, dtype=np.int8)
+    return cards % 13 + 1, cards // 13
+
+@njit(cache=True)
+def rank_value(rank):
+    """
+    Returns the Blackjack point value of a card rank (see server.rank_value)
+    """
+    if rank >= 11:
+        return 10
+    if rank == 1:
+        return 11
+    return rank
+
+@njit(cache=True)
+def hand_total_arr(ranks):
+    """
+    Calculates the total score of a hand given as an array of ranks
+    """
+    total = 0
+    for rank in ranks:
+        total += rank_value(rank)
+    return total
+
+@njit(cache=True)
+def who_won(player_score, dealer_score, player_busted, dealer_busted):
+    """
+    Determines the round result (see server.who_won), from the final scores
+
+    Returns:
+    One of:
+    GAME_RESULT_WIN / GAME_RESULT_LOSS / GAME_RESULT_TIE
+    """
+    if player_busted:
+        return GAME_RESULT_LOSS
+    if dealer_busted:
+        return GAME_RESULT_WIN
+    if player_score > dealer_score:
+        return GAME_RESULT_WIN
+    if player_score < dealer_score:
+        return GAME_RESULT_LOSS
+    return GAME_RESULT_TIE
+
+@njit(cache=True)
+def play_round(deck_ranks, stand_on):
+    """
+    Plays one round on a shuffled deck, the same way the server deals it
+
+    The player hits while their score is below stand_on (and stops once busted,
+    like the server's player_turn).
+    Cards are drawn from the end of the deck (like deck.pop() in the server):
+    2 player cards, dealer upcard, dealer hidden card, then player and dealer draws.
+
+    Parameters:
+    deck_ranks -- array of 52 ranks, already shuffled
+    stand_on   -- player stands once their score reaches this value
+
+    Returns:
+    One of:
+    GAME_RESULT_WIN / GAME_RESULT_LOSS / GAME_RESULT_TIE
+    """
+    top = len(deck_ranks) - 1
+
+    player_score = rank_value(deck_ranks[top]) + rank_value(deck_ranks[top - 1])
+    dealer_score = rank_value(deck_ranks[top - 2]) + rank_value(deck_ranks[top - 3])
+    top -= 4
+
+    # player turn
+    while player_score < stand_on and player_score <= 21:
+        player_score += rank_value(deck_ranks[top])
+        top -= 1
+    if player_score > 21:
+        return who_won(player_score, dealer_score, True, False)
+
+    # dealer turn
+    while dealer_score < 17:
+        dealer_score += rank_value(deck_ranks[top])
+        top -= 1
+
+    return who_won(player_score, dealer_score, False, dealer_score > 21)
+
+@njit(cache=True)
+def simulate_rounds(deck_ranks, rounds, stand_on, seed):
+    """
+    Plays many rounds, each one on a freshly shuffled copy of deck_ranks
+
+    Parameters:
+    deck_ranks -- array of 52 ranks (create_deck_arrays()[0])
+    rounds     -- number of rounds to play
+    stand_on   -- player stands once their score reaches this value
+    seed       -- random seed, the same seed gives the same results
+
+    Returns:
+    An array indexed by game result: counts[GAME_RESULT_WIN] is the number of wins, etc.
+    """
+    np.random.seed(seed)
+    counts = np.zeros(4, dtype=np.int64)
+    for _ in range(rounds):
+        counts[play_round(np.random.permutation(deck_ranks), stand_on)] += 1
+    return counts
@@ -1,38 +1,17 @@
+import asyncio
 import socket
 import random
-import time
 
-from protocol import (MAGIC_COOKIE, REQUEST_SIZE, SERVER_PAYLOAD_SIZE, CLIENT_PAYLOAD_SIZE, GAME_RESULT_NOTOVER, GAME_RESULT_LOSS, GAME_RESULT_TIE, GAME_RESULT_WIN, MTYPE_PAYLOAD, pack_server_payload, unpack_request, unpack_client_payload, pack_offer, unpack_offer)
+from protocol import (MAGIC_COOKIE, REQUEST_SIZE, SERVER_PAYLOAD_SIZE, CLIENT_PAYLOAD_SIZE, GAME_RESULT_NOTOVER, GAME_RESULT_LOSS, GAME_RESULT_TIE, GAME_RESULT_WIN, MTYPE_PAYLOAD, pack_server_payload, pack_notover_payload, pack_server_payload_into, unpack_request, unpack_client_payload, pack_offer, unpack_offer, unpack_cookie)
 
 SERVER_PORT = 2005
 SERVER_NAME = "Bossi"
 
-def recv_exact(sock, n):
-    """
-    Receives exactly n bytes from a TCP socket.
-
-    TCP is a stream-based protocol, which means that a single recv(n)
-    call is NOT guaranteed to return n bytes at once.
-    This function keeps reading from the socket until exactly n bytes
-    are received, or until the connection is closed.
-
-    Parameters:
-    sock -- an open TCP socket connected to a client
-    n    -- number of bytes to receive
+# the offer never changes, so it is packed once
+_OFFER_BYTES = pack_offer(SERVER_PORT, SERVER_NAME)
 
-    Returns:
-    A bytes object of length n.
-
-    Raises:
-    ConnectionError if the socket is closed before n bytes are received.
-    """
-    data = b"" # buffer to store received bytes
-    while len(data) < n: # try to receive the remaining number of bytes
-        chunk = sock.recv(n - len(data))
-        if chunk == b"": # if recv returns empty bytes, the connection was close
-            raise ConnectionError("socket closed while receiving")
-        data += chunk # append the received chunk to our buffer
-    return data
+# every (rank, suit) card, built once - suits 0-3, ranks A, 2-10, J, Q, K
+_BASE_DECK = tuple((card_rank, card_suit) for card_suit in range(4) for card_rank in range(1, 14))
 
 def create_deck():
     """
@@ -56,13 +35,7 @@ def create_deck():
     Returns:
     A list of 52 unique (rank, suit) tuples.
     """
-    deck = []
-
-    for card_suit in range(4): # hearts, dimonds, spades, clubs
-        for card_rank in range(1, 14): # A, 2-10, J, Q, K
-            deck.append((card_rank, card_suit))
-
-    return deck
+    return list(_BASE_DECK) # copy, the round pops cards from it
 
 def shuffle_deck(deck):
     """
@@ -76,6 +49,9 @@ def shuffle_deck(deck):
     """
     random.shuffle(deck)
 
+# point value per rank, indexed by rank (1-13), index 0 unused
+_RANK_VALUE = (0, 11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10)
+
 def rank_value(rank):
     """
     Returns the Blackjack point value of a card rank
@@ -91,18 +67,14 @@ def rank_value(rank):
     Returns:
     Integer value representing the card's contribution to the hand
     """
-    if rank >= 11:
-        return 10
-    if rank == 1:
-        return 11
-    return rank
+    return _RANK_VALUE[rank]
 
 def hand_total(hand):
     """
     Calculates the total score of a hand.
 
     Each card in the hand is a tuple: (rank, suit).
-    The score of each card is determined by rank_value(rank).
+    The score of each card is looked up in _RANK_VALUE.
 
     Note:
     - Ace (rank 1) is always worth 11 points.
@@ -114,19 +86,17 @@ def hand_total(hand):
     Returns:
     Integer representing the total score of the hand.
     """
-    total = 0
-
-    for (rank, suit) in hand:
-        total += rank_value(rank)
+    return sum(_RANK_VALUE[rank] for (rank, suit) in hand)
 
-    return total
 
-
-def initial_deal(deck, client_sock):
+def initial_deal(deck, writer):
     player_hand = []
     dealer_hand = []
     dealer_hidden = None # will be the second card
 
+    # the three visible cards are sent together in one buffer (one TCP write)
+    buf = bytearray(3 * SERVER_PAYLOAD_SIZE)
+
     for i in range(2): # draw players cards (2 cards)
         card = deck.pop() # draw a card
 
@@ -134,8 +104,8 @@ def initial_deal(deck, client_sock):
 
         card_rank, card_suit = card # unpack card
 
-        # send to the player its first card
-        client_sock.sendall(pack_server_payload(GAME_RESULT_NOTOVER, card_rank, card_suit))
+        # the player's card
+        pack_server_payload_into(buf, i * SERVER_PAYLOAD_SIZE, GAME_RESULT_NOTOVER, card_rank, card_suit)
 
     # draw dealer cards (first known to all and the second is hidden)
     dealer_first_card = deck.pop() # draw a card
@@ -144,15 +114,18 @@ def initial_deal(deck, client_sock):
     
     dealer_first_card_rank, dealer_first_card_suit = dealer_first_card # unpack card
 
-    # send to the player the dealers first card
-    client_sock.sendall(pack_server_payload(GAME_RESULT_NOTOVER, dealer_first_card_rank, dealer_first_card_suit))
+    # the dealers first card
+    pack_server_payload_into(buf, 2 * SERVER_PAYLOAD_SIZE, GAME_RESULT_NOTOVER, dealer_first_card_rank, dealer_first_card_suit)
+
+    # send to the player its two cards and the dealers first card
+    writer.write(buf)
 
     # dealers second card
     dealer_hidden = deck.pop() # draw the second card
     
     return (player_hand, dealer_hand, dealer_hidden)
  
-def player_turn(client_sock, deck, player_hand):
+async def player_turn(reader, writer, deck, player_hand):
     """
     Handles the player's turn.
 
@@ -163,8 +136,12 @@ def player_turn(client_sock, deck, player_hand):
     If at any point the player's total score reaches 22 or more,
     the player is considered busted.
 
+    Everything written so far is flushed (drain) only here, right before
+    waiting for the client, since the client needs those cards to decide.
+
     Parameters:
-    client_sock -- TCP socket connected to the client
+    reader      -- asyncio StreamReader of the client connection
+    writer      -- asyncio StreamWriter of the client connection
     deck        -- list of remaining cards (deck.pop() draws a card)
     player_hand -- list of cards currently in the player's hand
 
@@ -172,19 +149,21 @@ def player_turn(client_sock, deck, player_hand):
     A tuple:
     (player_busted: bool)
     """
-    while True: # calculate players score
-        score = hand_total(player_hand)
+    score = hand_total(player_hand) # players score, updated on every new card
 
+    while True:
         if score > 21: # check if player busted
             return True # player busted => lost
         
         # receive decision from client - 10 bytes
-        data = recv_exact(client_sock, CLIENT_PAYLOAD_SIZE)
-        cookie, msg_type, decision = unpack_client_payload(data)
+        await writer.drain()
+        data = await reader.readexactly(CLIENT_PAYLOAD_SIZE)
 
-        # validate protocol
-        if cookie != MAGIC_COOKIE:
+        # validate protocol (cookie only, before unpacking the rest)
+        if unpack_cookie(data) != MAGIC_COOKIE:
             raise ValueError("Invalid magic cookie from client")
+
+        cookie, msg_type, decision = unpack_client_payload(data)
         
         # handle decision
         if decision == "Hittt":
@@ -193,9 +172,10 @@ def player_turn(client_sock, deck, player_hand):
             player_hand.append(new_card)
 
             new_rank, new_suit = new_card
+            score += _RANK_VALUE[new_rank]
 
             # send new card to the client
-            client_sock.sendall(pack_server_payload(GAME_RESULT_NOTOVER, new_rank, new_suit))
+            writer.write(pack_notover_payload(new_rank, new_suit))
 
             # continue loop if player choose hit again
         elif decision == "Stand":
@@ -204,7 +184,7 @@ def player_turn(client_sock, deck, player_hand):
         else:
             raise ValueError(f"Invalid decision from client: {decision}")    
 
-def dealer_turn(client_sock, deck, dealer_hand, dealer_hidden):
+def dealer_turn(writer, deck, dealer_hand, dealer_hidden):
     """
     Handles the dealer's turn.
 
@@ -218,7 +198,7 @@ def dealer_turn(client_sock, deck, dealer_hand, dealer_hidden):
       with GAME_RESULT_NOTOVER and the drawn card (rank, suit).
 
     Parameters:
-    client_sock    -- TCP socket connected to the client
+    writer         -- asyncio StreamWriter of the client connection
     deck           -- list of remaining cards (deck.pop() draws a card)
     dealer_hand    -- list of dealer visible cards (already has the first upcard)
     dealer_hidden  -- the dealer's hidden card (rank, suit tuple)
@@ -228,26 +208,29 @@ def dealer_turn(client_sock, deck, dealer_hand, dealer_hidden):
     (dealer_busted: bool)
     """
     # reveal the hidden card to the client
+    # the client does not answer during the dealer turn, so all the dealer
+    # cards are collected and sent in a single write
     dealer_hand.append(dealer_hidden)
     hidden_rank, hidden_suit = dealer_hidden
-    client_sock.sendall(pack_server_payload(GAME_RESULT_NOTOVER, hidden_rank, hidden_suit))
+    payloads = [pack_notover_payload(hidden_rank, hidden_suit)]
+    dealer_score = hand_total(dealer_hand) # updated on every new card
 
     # keep draw cards until dealer reaches 17+
     while True:
-        dealer_score = hand_total(dealer_hand)
-
-        if dealer_score > 21:
-            return True # dealer bust
-        
         if dealer_score >= 17:
-            return False # dealer stands and not bust
+            break # dealer stands (or busted)
         
         # draw another card
         new_card = deck.pop()
         dealer_hand.append(new_card)
 
         new_rank, new_suit = new_card
-        client_sock.sendall(pack_server_payload(GAME_RESULT_NOTOVER, new_rank, new_suit))
+        dealer_score += _RANK_VALUE[new_rank]
+        payloads.append(pack_notover_payload(new_rank, new_suit))
+
+    writer.write(b"".join(payloads))
+
+    return dealer_score > 21 # dealer bust, otherwise dealer stands and not bust
 
 def who_won(player_hand, dealer_hand, player_busted, dealer_busted):
     """
@@ -286,7 +269,7 @@ def who_won(player_hand, dealer_hand, player_busted, dealer_busted):
         return GAME_RESULT_LOSS
     return GAME_RESULT_TIE
 
-def end_round(client_sock, game_result):
+def end_round(writer, game_result):
     """
     Sends the final result of the round to the client.
 
@@ -296,12 +279,12 @@ def end_round(client_sock, game_result):
     - card_suit = 0
 
     Parameters:
-    client_sock -- TCP socket connected to the client
+    writer      -- asyncio StreamWriter of the client connection
     game_result -- one of GAME_RESULT_WIN / GAME_RESULT_LOSS / GAME_RESULT_TIE
     """
-    client_sock.sendall(pack_server_payload(game_result, 0, 0))
+    writer.write(pack_server_payload(game_result, 0, 0))
  
-def run_match_for_client(client_sock, rounds):
+async def run_match_for_client(reader, writer, rounds):
     """
     Runs a full match (multiple rounds) with a connected client.
     "the game itself"
@@ -315,7 +298,8 @@ def run_match_for_client(client_sock, rounds):
     - end_round: send final game result to client
 
     Parameters:5
-    client_sock -- TCP socket connected to the client
+    reader      -- asyncio StreamReader of the client connection
+    writer      -- asyncio StreamWriter of the client connection
     rounds      -- number of rounds to play (0-255)
     """
     for r in range(rounds):
@@ -326,7 +310,7 @@ def run_match_for_client(client_sock, rounds):
         shuffle_deck(deck)
 
         # initial deal
-        player_hand, dealer_hand, dealer_hidden = initial_deal(deck, client_sock)
+        player_hand, dealer_hand, dealer_hidden = initial_deal(deck, writer)
 
         # check if player busted before playing (H\S)
         if hand_total(player_hand) > 21:
@@ -334,100 +318,100 @@ def run_match_for_client(client_sock, rounds):
             dealer_busted = False            
         else:
             # player turn
-            player_busted = player_turn(client_sock, deck, player_hand)
+            player_busted = await player_turn(reader, writer, deck, player_hand)
 
             # dealer turn, if player not busted
             dealer_busted = False
             if not player_busted:
-                dealer_busted = dealer_turn(client_sock, deck, dealer_hand, dealer_hidden)
+                dealer_busted = dealer_turn(writer, deck, dealer_hand, dealer_hidden)
 
         # decide winner + send final result
         result = who_won(player_hand, dealer_hand, player_busted, dealer_busted)
-        end_round(client_sock, result)
+        end_round(writer, result)
+        await writer.drain() # one flush per round for the dealer cards and the result
 
         print(f"[GAME] round result = {result}")
 
-def run_single_threaded_server():
+async def handle_client(reader, writer):
+    """
+    Serves one connected client from start to end (one asyncio task per client):
+    1. Receive the REQUEST (name and rounds).
+    2. Play the match.
+    3. Close the connection.
+
+    Parameters:
+    reader -- asyncio StreamReader of the client connection
+    writer -- asyncio StreamWriter of the client connection
+    """
+    # asyncio turns on TCP_NODELAY for TCP streams, so each card goes out right away
+    addr = writer.get_extra_info("peername")
+
+    print(f"client connected from {addr}")
+    try:
+        # receive the initial request (name and rounds)
+        req_data = await reader.readexactly(REQUEST_SIZE)
+        if unpack_cookie(req_data) != MAGIC_COOKIE: # before decoding the name
+            print("Invalid Cookie, dropping client.")
+        else:
+            cookie, msg_type, rounds, client_name = unpack_request(req_data)
+            print(f"[TCP] game starting with {client_name}")
+            # run the actual game logic
+            await run_match_for_client(reader, writer, rounds)
+    except Exception as e:
+        print(f"error during game: {e}")
+
+    finally:
+        # clean up the connection
+        writer.close()
+        print(f"--- game with {addr} finished ---")
+
+class OfferSenderProtocol(asyncio.DatagramProtocol):
+    """
+    Datagram protocol of the offer broadcast socket, only reports send errors
+    """
+
+    def error_received(self, e):
+        print(f"error: {e}")
+
+async def broadcast_offers(transport, dest_port, interval):
     """
-    This function manages the server in a single loop (Serial/Sequential flow):
-    1. Send ONE UDP broadcast offer.
-    2. Wait (Block) for a TCP connection.
-    3. Play the game.
-    4. Repeat.
+    Sends the UDP broadcast offer every `interval` seconds, forever.
+    Runs next to the TCP server, so offers keep going while games are played.
     """
+    while True:
+        transport.sendto(_OFFER_BYTES, ('255.255.255.255', dest_port))
+        await asyncio.sleep(interval)
+
+async def run_server():
+    """
+    This function manages the server on one asyncio event loop:
+    - A task sends a UDP broadcast offer every OFFER_INTERVAL seconds.
+    - The TCP server accepts clients and plays every game in its own task
+      (handle_client), so any number of matches run at the same time.
+    """
+    loop = asyncio.get_running_loop()
+
     # UDP for broadcast
-    udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
     UDP_DEST_PORT = 13122 # as defined in the instructions
+    OFFER_INTERVAL = 1.0 # seconds between offers
+    udp_transport, _ = await loop.create_datagram_endpoint(OfferSenderProtocol, family=socket.AF_INET, allow_broadcast=True)
 
     # hear out TCP broadcast
-    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server_sock.bind(("", SERVER_PORT))
-    ip_addr = server_sock.getsockname()[0]
-    server_sock.listen(1)
+    # allow several server processes to listen on the same port, the kernel spreads new connections between them
+    # (asyncio already sets SO_REUSEADDR, which is the fallback where SO_REUSEPORT does not exist)
+    server = await asyncio.start_server(handle_client, "", SERVER_PORT, family=socket.AF_INET, reuse_port=hasattr(socket, "SO_REUSEPORT"))
+    ip_addr = server.sockets[0].getsockname()[0]
 
-    # timeout to get the server from getting stuck in .accept(), it alows us to wake up every sec and send another UDP offer
-    server_sock.settimeout(1.0)
-
-    
     print(f"Server started, listening on IP address {ip_addr}")
 
-    while True:
-        client_sock = None
-        addr = None
-
-        # wait and broadcast loop
-        # we stay in this loop until a client connects
-        print("broadcasting offers and waiting for client...")
-
-        while True:
-            try:
-                # sending UDP offer for connection
-                offer_msg = pack_offer(SERVER_PORT, SERVER_NAME)
-                udp_sock.sendto(offer_msg, ('255.255.255.255', UDP_DEST_PORT))
-
-                # wait a sec to see if someone connects
-                # if no connects within 1 sec, it raises a socket.timeout exception
-                client_sock, addr = server_sock.accept()
-
-                # if we got here it means someone connected
-                break
-            
-            except socket.timeout:
-                # no one came after a sec, the loop run again and we'll send another UDP
-                continue
-            except Exception as e:
-                print(f"error: {e}")
-                break
-        
-        # game mode
-        if client_sock:
-            # we cancel the timeout so it wont stuck the game
-            client_sock.settimeout(None)
-
-            print(f"client connected from {addr}")
-            try:
-                # receive the initial request (name and rounds)
-                req_data = recv_exact(client_sock, REQUEST_SIZE)
-                cookie, msg_type, rounds, client_name = unpack_request(req_data)
-
-                if cookie != MAGIC_COOKIE:
-                    print("Invalid Cookie, dropping client.")
-                else:
-                    print(f"[TCP] game starting with {client_name}")
-                    # run the actual game logic
-                    run_match_for_client(client_sock, rounds)
-            except Exception as e:
-                print(f"error during game: {e}")
-
-            finally:
-                # clean up the connection so we can serve the next player
-                client_sock.close()
-                print("--- game finished, back to broadcasting ---")
-
-                # wait 1 sec before screaming again
-                time.sleep(1)
+    # wait and broadcast loop
+    print("broadcasting offers and waiting for clients...")
+
+    try:
+        async with server:
+            await asyncio.gather(server.serve_forever(), broadcast_offers(udp_transport, UDP_DEST_PORT, OFFER_INTERVAL))
+    finally:
+        udp_transport.close()
 
 if __name__ == "__main__":
-    run_single_threaded_server()
\ No newline at end of file
+    asyncio.run(run_server())
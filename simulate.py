@@ -0,0 +1,41 @@
+import argparse
+import time
+
+from protocol import GAME_RESULT_LOSS, GAME_RESULT_TIE, GAME_RESULT_WIN
+from scoring_fast import create_deck_arrays, simulate_rounds
+
+def main():
+    """
+    Simulates many rounds with the server's rules and a fixed player strategy
+    (hit below --stand-on), and prints the results
+
+    Useful to check the rules or compare strategies without a server and client
+
+    Requires numpy, Numba is optional (pip install numpy numba)
+    """
+    parser = argparse.ArgumentParser(description="Simulate Blackjack rounds with the server's rules")
+    parser.add_argument("--rounds", type=int, default=1_000_000, help="number of rounds to play")
+    parser.add_argument("--stand-on", type=int, default=17, help="player stands once the score reaches this value")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    if args.rounds < 1:
+        parser.error("--rounds must be at least 1")
+    if not (2 <= args.stand_on <= 22):
+        parser.error("--stand-on must be between 2 and 22")
+
+    deck_ranks, _ = create_deck_arrays() # suits do not affect the score
+
+    start = time.perf_counter()
+    counts = simulate_rounds(deck_ranks, args.rounds, args.stand_on, args.seed)
+    elapsed = time.perf_counter() - start
+
+    wins = counts[GAME_RESULT_WIN]
+    losses = counts[GAME_RESULT_LOSS]
+    ties = counts[GAME_RESULT_TIE]
+    print(f"{args.rounds} rounds, standing on {args.stand_on} ({elapsed:.2f}s)")
+    print(f"wins={wins}, losses={losses}, ties={ties}")
+    print(f"win rate {wins / args.rounds:.4f}")
+
+if __name__ == "__main__":
+    main()